@@ -6,11 +6,11 @@
 """Generates an Android Studio project from a GN target."""
 
 import argparse
-import codecs
-import glob
+import collections
+import hashlib
 import logging
+import multiprocessing.pool
 import os
-import re
 import shutil
 import subprocess
 import sys
@@ -35,6 +35,7 @@ _SRCJARS_SUBDIR = 'extracted-srcjars'
 _JNI_LIBS_SUBDIR = 'symlinked-libs'
 _ARMEABI_SUBDIR = 'armeabi'
 _RES_SUBDIR = 'extracted-res'
+_EXTRACT_STAMP = '.extract_stamp'
 
 _DEFAULT_TARGETS = [
     # TODO(agrieve): Requires alternate android.jar to compile.
@@ -56,6 +57,39 @@ def _TemplatePath(name):
   return os.path.join(_FILE_DIR, '{}.jinja'.format(name))
 
 
+# Caches for _RebasePathScalar(). Rebasing is called once per java file,
+# srcjar, res zip and dep of every entry, mostly with identical arguments, so
+# memoizing both the cwd resolution and the final result avoids re-running
+# os.path.abspath()/relpath() (and their getcwd() syscalls) thousands of times.
+_abspath_cache = {}
+_rebase_cache = {}
+
+
+def _CachedAbsPath(path):
+  result = _abspath_cache.get(path)
+  if result is None:
+    result = os.path.abspath(path)
+    _abspath_cache[path] = result
+  return result
+
+
+def _RebasePathScalar(path, new_cwd, old_cwd):
+  key = (path, new_cwd, old_cwd)
+  result = _rebase_cache.get(key)
+  if result is not None:
+    return result
+  if old_cwd is None:
+    old_cwd = constants.GetOutDirectory()
+  old_cwd = _CachedAbsPath(old_cwd)
+  if new_cwd:
+    result = os.path.relpath(
+        os.path.join(old_cwd, path), _CachedAbsPath(new_cwd))
+  else:
+    result = os.path.abspath(os.path.join(old_cwd, path))
+  _rebase_cache[key] = result
+  return result
+
+
 def _RebasePath(path_or_list, new_cwd=None, old_cwd=None):
   """Makes the given path(s) relative to new_cwd, or absolute if not specified.
 
@@ -65,14 +99,23 @@ def _RebasePath(path_or_list, new_cwd=None, old_cwd=None):
   if path_or_list is None:
     return []
   if not isinstance(path_or_list, basestring):
-    return [_RebasePath(p, new_cwd, old_cwd) for p in path_or_list]
-  if old_cwd is None:
-    old_cwd = constants.GetOutDirectory()
-  old_cwd = os.path.abspath(old_cwd)
-  if new_cwd:
-    new_cwd = os.path.abspath(new_cwd)
-    return os.path.relpath(os.path.join(old_cwd, path_or_list), new_cwd)
-  return os.path.abspath(os.path.join(old_cwd, path_or_list))
+    return [_RebasePathScalar(p, new_cwd, old_cwd) for p in path_or_list]
+  return _RebasePathScalar(path_or_list, new_cwd, old_cwd)
+
+
+# Cache of .build_config path -> parsed JSON, shared across _ProjectEntry
+# instances since FromBuildConfigPath() creates a new instance per DAG edge
+# and the same config would otherwise be parsed once per parent. Callers must
+# not mutate the returned values.
+_build_config_cache = {}
+
+
+def _ReadBuildConfig(path):
+  config = _build_config_cache.get(path)
+  if config is None:
+    config = build_utils.ReadJson(path)
+    _build_config_cache[path] = config
+  return config
 
 
 def _IsSubpathOf(child, parent):
@@ -81,18 +124,30 @@ def _IsSubpathOf(child, parent):
 
 
 def _WriteFile(path, data):
-  """Writes |data| to |path|, constucting parent directories if necessary."""
+  """Writes |data| to |path|, constucting parent directories if necessary.
+
+  Skips the write when the file already has the desired contents, preserving
+  its mtime for gradle's up-to-date checks."""
+  encoded = data.encode('utf-8')
+  try:
+    with open(path, 'rb') as f:
+      if f.read() == encoded:
+        return
+  except IOError:
+    pass
   logging.info('Writing %s', path)
   dirname = os.path.dirname(path)
   if not os.path.exists(dirname):
     os.makedirs(dirname)
-  with codecs.open(path, 'w', 'utf-8') as output_file:
-    output_file.write(data)
+  with open(path, 'wb') as output_file:
+    output_file.write(encoded)
 
 
 def _ReadBuildVars(output_dir):
+  # Read the whole file in one call and split in memory rather than
+  # iterating the file object line-by-line.
   with open(os.path.join(output_dir, 'build_vars.txt')) as f:
-    return dict(l.rstrip().split('=', 1) for l in f)
+    return dict(l.split('=', 1) for l in f.read().splitlines())
 
 
 def _RunNinja(output_dir, args):
@@ -106,19 +161,40 @@ def _QueryForAllGnTargets(output_dir):
   # Query ninja rather than GN since it's faster.
   cmd = ['ninja', '-C', output_dir, '-t', 'targets']
   logging.info('Running: %r', cmd)
-  ninja_output = build_utils.CheckOutput(cmd)
+  # The full target list can be tens of MB, so filter it as it streams
+  # rather than buffering it (and a second splitlines() copy) in memory.
+  proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
   ret = []
-  SUFFIX_LEN = len('__build_config')
-  for line in ninja_output.splitlines():
-    ninja_target = line.rsplit(':', 1)[0]
+  SUFFIX = '__build_config'
+  SUFFIX_LEN = len(SUFFIX)
+  for line in proc.stdout:
+    ninja_target = line[:line.rfind(':')]
     # Ignore root aliases by ensure a : exists.
-    if ':' in ninja_target and ninja_target.endswith('__build_config'):
+    if ':' in ninja_target and ninja_target.endswith(SUFFIX):
       ret.append('//' + ninja_target[:-SUFFIX_LEN])
+  if proc.wait() != 0:
+    raise subprocess.CalledProcessError(proc.returncode, cmd)
   return ret
 
 
+def _ProjectNameFromBuildConfigPath(path):
+  """Returns _ProjectEntry.FromBuildConfigPath(path).ProjectName().
+
+  Skips constructing the _ProjectEntry when only the name is needed."""
+  prefix = 'gen/'
+  suffix = '.build_config'
+  assert path.startswith(prefix) and path.endswith(suffix), path
+  return path[len(prefix):-len(suffix)].replace(os.path.sep, '>')
+
+
 class _ProjectEntry(object):
   """Helper class for project entries."""
+
+  # Flyweight cache of normalized GN target -> instance. Dep scanning visits
+  # targets once per edge, so most lookups hit an existing instance (and its
+  # already-populated memoized state).
+  _cached_entries = {}
+
   def __init__(self, gn_target):
     assert gn_target.startswith('//'), gn_target
     if ':' not in gn_target:
@@ -126,15 +202,25 @@ class _ProjectEntry(object):
     self._gn_target = gn_target
     self._build_config = None
     self._java_files = None
+    self._gradle_subdir = None
+    self._project_name = None
     self.android_test_entry = None
 
+  @classmethod
+  def FromGnTarget(cls, gn_target):
+    if ':' not in gn_target:
+      gn_target = '%s:%s' % (gn_target, os.path.basename(gn_target))
+    if gn_target not in cls._cached_entries:
+      cls._cached_entries[gn_target] = cls(gn_target)
+    return cls._cached_entries[gn_target]
+
   @classmethod
   def FromBuildConfigPath(cls, path):
     prefix = 'gen/'
     suffix = '.build_config'
     assert path.startswith(prefix) and path.endswith(suffix), path
     subdir = path[len(prefix):-len(suffix)]
-    return cls('//%s:%s' % (os.path.split(subdir)))
+    return cls.FromGnTarget('//%s:%s' % (os.path.split(subdir)))
 
   def __hash__(self):
     return hash(self._gn_target)
@@ -156,17 +242,21 @@ class _ProjectEntry(object):
 
   def GradleSubdir(self):
     """Returns the output subdirectory."""
-    return self.NinjaTarget().replace(':', os.path.sep)
+    if self._gradle_subdir is None:
+      self._gradle_subdir = self.NinjaTarget().replace(':', os.path.sep)
+    return self._gradle_subdir
 
   def ProjectName(self):
     """Returns the Gradle project name."""
-    return self.GradleSubdir().replace(os.path.sep, '>')
+    if self._project_name is None:
+      self._project_name = self.GradleSubdir().replace(os.path.sep, '>')
+    return self._project_name
 
   def BuildConfig(self):
     """Reads and returns the project's .build_config JSON."""
     if not self._build_config:
       path = os.path.join('gen', self.GradleSubdir() + '.build_config')
-      self._build_config = build_utils.ReadJson(_RebasePath(path))
+      self._build_config = _ReadBuildConfig(_RebasePath(path))
     return self._build_config
 
   def DepsInfo(self):
@@ -204,6 +294,11 @@ class _ProjectContextGenerator(object):
     self.build_vars = build_vars
     self.use_gradle_process_resources = use_gradle_process_resources
     self.jinja_processor = jinja_processor
+    # Rendered manifests keyed by package name. The other template inputs are
+    # constant across entries, so entries sharing a package share the output.
+    self._rendered_manifest_cache = {}
+    # EntryOutputDir() is called several times per entry per Generate().
+    self._entry_output_dir_cache = {}
 
   def _GenJniLibs(self, entry):
     native_section = entry.BuildConfig().get('native')
@@ -245,11 +340,15 @@ class _ProjectContextGenerator(object):
           'multiple packages. Unable to process with gradle.')
       return _DEFAULT_ANDROID_MANIFEST_PATH
 
-    variables = {}
-    variables['compile_sdk_version'] = self.build_vars['android_sdk_version']
-    variables['package'] = resource_packages[0]
+    package = resource_packages[0]
+    data = self._rendered_manifest_cache.get(package)
+    if data is None:
+      variables = {}
+      variables['compile_sdk_version'] = self.build_vars['android_sdk_version']
+      variables['package'] = package
 
-    data = self.jinja_processor.Render(_TemplatePath('manifest'), variables)
+      data = self.jinja_processor.Render(_TemplatePath('manifest'), variables)
+      self._rendered_manifest_cache[package] = data
     _WriteFile(output_file, data)
 
     return output_file
@@ -258,7 +357,11 @@ class _ProjectContextGenerator(object):
     return _RebasePath(paths, self.EntryOutputDir(entry))
 
   def EntryOutputDir(self, entry):
-    return os.path.join(self.project_dir, entry.GradleSubdir())
+    output_dir = self._entry_output_dir_cache.get(entry)
+    if output_dir is None:
+      output_dir = os.path.join(self.project_dir, entry.GradleSubdir())
+      self._entry_output_dir_cache[entry] = output_dir
+    return output_dir
 
   def Srcjars(self, entry):
     srcjars = _RebasePath(entry.Gradle().get('bundled_srcjars', []))
@@ -293,36 +396,43 @@ class _ProjectContextGenerator(object):
       else:
         android_manifest = _DEFAULT_ANDROID_MANIFEST_PATH
     variables['android_manifest'] = self._Relativize(entry, android_manifest)
-    deps = [_ProjectEntry.FromBuildConfigPath(p)
-            for p in entry.Gradle()['dependent_android_projects']]
-    variables['android_project_deps'] = [d.ProjectName() for d in deps]
+    variables['android_project_deps'] = [
+        _ProjectNameFromBuildConfigPath(p)
+        for p in entry.Gradle()['dependent_android_projects']]
     # TODO(agrieve): Add an option to use interface jars and see if that speeds
     # things up at all.
     variables['prebuilts'] = self._Relativize(
         entry, entry.Gradle()['dependent_prebuilt_jars'])
-    deps = [_ProjectEntry.FromBuildConfigPath(p)
-            for p in entry.Gradle()['dependent_java_projects']]
-    variables['java_project_deps'] = [d.ProjectName() for d in deps]
+    variables['java_project_deps'] = [
+        _ProjectNameFromBuildConfigPath(p)
+        for p in entry.Gradle()['dependent_java_projects']]
     return variables
 
 
+# Recognize these directory names as marking the top of a java source tree:
+# root tokens are included in the source dir, package tokens are not.
+_ROOT_TOKENS = frozenset(('java', 'src'))
+_PACKAGE_TOKENS = frozenset(('javax', 'org', 'com'))
+
+
 def _ComputeJavaSourceDirs(java_files):
   """Returns a dictionary of source dirs with each given files in one."""
-  found_roots = {}
+  found_roots = collections.defaultdict(list)
+  sep = os.path.sep
   for path in java_files:
-    path_root = path
-    # Recognize these tokens as top-level.
-    while True:
-      path_root = os.path.dirname(path_root)
-      basename = os.path.basename(path_root)
-      assert basename, 'Failed to find source dir for ' + path
-      if basename in ('java', 'src'):
+    # Split once and scan the components from the file upwards rather than
+    # repeatedly calling os.path.dirname()/basename() per level.
+    parts = path.split(sep)
+    for i in xrange(len(parts) - 2, -1, -1):
+      component = parts[i]
+      if component in _ROOT_TOKENS:
+        path_root = sep.join(parts[:i + 1])
         break
-      if basename in ('javax', 'org', 'com'):
-        path_root = os.path.dirname(path_root)
+      if component in _PACKAGE_TOKENS:
+        path_root = sep.join(parts[:i])
         break
-    if path_root not in found_roots:
-      found_roots[path_root] = []
+    else:
+      assert False, 'Failed to find source dir for ' + path
     found_roots[path_root].append(path)
   return found_roots
 
@@ -336,11 +446,23 @@ def _ComputeExcludeFilters(wanted_files, unwanted_files, parent_dir):
   excludes = []
   files_to_include = set(wanted_files)
   files_to_exclude = set(unwanted_files)
+  # List each directory once up-front rather than re-globbing it for every
+  # excluded file it contains.
+  dir_to_java_files = {}
+  for path in files_to_include | files_to_exclude:
+    dirname = os.path.dirname(path)
+    if dirname not in dir_to_java_files:
+      try:
+        dir_to_java_files[dirname] = frozenset(
+            os.path.join(dirname, f) for f in os.listdir(dirname)
+            if f.endswith('.java'))
+      except OSError:
+        dir_to_java_files[dirname] = frozenset()
   while files_to_exclude:
     unwanted_file = files_to_exclude.pop()
     target_exclude = os.path.join(
         os.path.dirname(unwanted_file), '*.java')
-    found_files = set(glob.glob(target_exclude))
+    found_files = dir_to_java_files[os.path.dirname(unwanted_file)]
     valid_files = found_files & files_to_include
     if valid_files:
       excludes.append(os.path.relpath(unwanted_file, parent_dir))
@@ -350,6 +472,18 @@ def _ComputeExcludeFilters(wanted_files, unwanted_files, parent_dir):
   return excludes
 
 
+def _FindJavaFiles(directory):
+  """Returns the set of all .java files under |directory|.
+
+  Cheaper than build_utils.FindInDirectory() here since a plain suffix check
+  replaces an fnmatch per file name, and no intermediate lists are built."""
+  found = set()
+  for root, _, filenames in os.walk(directory):
+    found.update(os.path.join(root, f) for f in filenames
+                 if f.endswith('.java'))
+  return found
+
+
 def _CreateJavaSourceDir(output_dir, java_files):
   """Computes the list of java source directories and exclude patterns.
 
@@ -362,13 +496,30 @@ def _CreateJavaSourceDir(output_dir, java_files):
   if java_files:
     java_files = _RebasePath(java_files)
     computed_dirs = _ComputeJavaSourceDirs(java_files)
-    java_dirs = computed_dirs.keys()
+    java_dirs = list(computed_dirs)
     all_found_java_files = set()
 
+    # Walk each subtree only once: when a source root lies inside another
+    # (common for org/chromium packages), filter the containing root's results
+    # rather than re-walking the shared subtree. Sorting guarantees containing
+    # roots are walked before the roots nested within them.
+    dir_to_found = {}
+    for directory in sorted(computed_dirs):
+      found_java_files = None
+      for walked_dir, walked_files in dir_to_found.iteritems():
+        if _IsSubpathOf(directory, walked_dir):
+          prefix = directory + os.path.sep
+          found_java_files = set(
+              p for p in walked_files if p.startswith(prefix))
+          break
+      if found_java_files is None:
+        found_java_files = _FindJavaFiles(directory)
+      dir_to_found[directory] = found_java_files
+
     for directory, files in computed_dirs.iteritems():
-      found_java_files = build_utils.FindInDirectory(directory, '*.java')
+      found_java_files = dir_to_found[directory]
       all_found_java_files.update(found_java_files)
-      unwanted_java_files = set(found_java_files) - set(files)
+      unwanted_java_files = found_java_files.difference(files)
       if unwanted_java_files:
         logging.debug('Directory requires excludes: %s', directory)
         excludes.extend(
@@ -385,28 +536,51 @@ def _CreateJavaSourceDir(output_dir, java_files):
   return java_dirs, excludes
 
 
-def _CreateRelativeSymlink(target_path, link_path):
-  link_dir = os.path.dirname(link_path)
-  relpath = os.path.relpath(target_path, link_dir)
-  logging.debug('Creating symlink %s -> %s', link_path, relpath)
-  os.symlink(relpath, link_path)
+def _CreateLink(target_path, link_path):
+  """Hardlinks |target_path| at |link_path|, falling back to a symlink.
+
+  Hardlinks let gradle's inode and mtime based up-to-date checks work, but
+  are not possible when the target does not exist yet (generated .so files)
+  or lives on another filesystem."""
+  logging.debug('Creating link %s -> %s', link_path, target_path)
+  try:
+    os.link(target_path, link_path)
+  except OSError:
+    relpath = os.path.relpath(target_path, os.path.dirname(link_path))
+    os.symlink(relpath, link_path)
 
 
 def _CreateJniLibsDir(output_dir, entry_output_dir, so_files):
-  """Creates directory with symlinked .so files if necessary.
+  """Creates directory with linked .so files if necessary.
 
   Returns list of JNI libs directories."""
 
   if so_files:
     symlink_dir = os.path.join(entry_output_dir, _JNI_LIBS_SUBDIR)
-    shutil.rmtree(symlink_dir, True)
-    abi_dir = os.path.join(symlink_dir, _ARMEABI_SUBDIR)
-    if not os.path.exists(abi_dir):
-      os.makedirs(abi_dir)
+    # Skip the rmtree and relink when the set of .so files is unchanged.
+    stamp = hashlib.md5(repr(sorted(so_files))).hexdigest()
+    stamp_path = os.path.join(symlink_dir, '.stamp')
+    try:
+      with open(stamp_path) as f:
+        if f.read() == stamp:
+          return [symlink_dir]
+    except IOError:
+      pass
+    # Populate a sibling directory, then swap it into place with a single
+    # rename so the old contents disappear in one operation rather than one
+    # unlink per file, and watchers never see a half-built directory.
+    new_dir = symlink_dir + '.new'
+    shutil.rmtree(new_dir, True)
+    abi_dir = os.path.join(new_dir, _ARMEABI_SUBDIR)
+    os.makedirs(abi_dir)
     for so_file in so_files:
       target_path = os.path.join(output_dir, so_file)
-      symlinked_path = os.path.join(abi_dir, so_file)
-      _CreateRelativeSymlink(target_path, symlinked_path)
+      linked_path = os.path.join(abi_dir, so_file)
+      _CreateLink(target_path, linked_path)
+    with open(os.path.join(new_dir, '.stamp'), 'w') as f:
+      f.write(stamp)
+    shutil.rmtree(symlink_dir, True)
+    os.rename(new_dir, symlink_dir)
 
     return [symlink_dir]
 
@@ -494,29 +668,78 @@ def _ExtractFile(zip_path, extracted_path):
     z.extractall(extracted_path)
 
 
+def _ExtractZipsForPath(extracted_path, zip_paths):
+  """Clears |extracted_path| and extracts all of |zip_paths| into it.
+
+  No-op when the zips are older than the previous extraction, so re-runs
+  where nothing changed skip the rmtree and re-extract entirely.
+  """
+  src_mtime = max(os.path.getmtime(z) for z in zip_paths)
+  stamp_path = os.path.join(extracted_path, _EXTRACT_STAMP)
+  try:
+    with open(stamp_path) as f:
+      if float(f.read()) == src_mtime:
+        logging.info('Skipping extraction of unchanged %s', extracted_path)
+        return
+  except (IOError, ValueError):
+    pass
+  # Extract into a sibling directory and swap it into place with a single
+  # rename, replacing the per-file unlinks of an rmtree of the live dir.
+  new_dir = extracted_path + '.new'
+  shutil.rmtree(new_dir, True)
+  for zip_path in zip_paths:
+    _ExtractFile(zip_path, new_dir)
+  if not os.path.isdir(new_dir):
+    os.makedirs(new_dir)
+  with open(os.path.join(new_dir, _EXTRACT_STAMP), 'w') as f:
+    f.write(repr(src_mtime))
+  shutil.rmtree(extracted_path, True)
+  os.rename(new_dir, extracted_path)
+
+
 def _ExtractZips(entry_output_dir, zip_tuples):
   """Extracts all srcjars to the directory given by the tuples."""
-  extracted_paths = set(s[1] for s in zip_tuples)
-  for extracted_path in extracted_paths:
+  path_to_zips = collections.defaultdict(list)
+  for zip_path, extracted_path in zip_tuples:
     assert _IsSubpathOf(extracted_path, entry_output_dir)
-    shutil.rmtree(extracted_path, True)
+    path_to_zips[extracted_path].append(zip_path)
 
-  for zip_path, extracted_path in zip_tuples:
-    _ExtractFile(zip_path, extracted_path)
+  # Extraction is I/O bound and independent per output directory, so extract
+  # on a thread pool. Zips sharing an output directory stay on one thread to
+  # avoid racing on directory creation.
+  pool = multiprocessing.pool.ThreadPool(processes=8)
+  try:
+    pool.map(lambda item: _ExtractZipsForPath(*item), path_to_zips.items())
+  finally:
+    pool.close()
+    pool.join()
 
 
 def _FindAllProjectEntries(main_entries):
   """Returns the list of all _ProjectEntry instances given the root project."""
   found = set()
-  to_scan = list(main_entries)
-  while to_scan:
-    cur_entry = to_scan.pop()
-    if cur_entry in found:
-      continue
-    found.add(cur_entry)
-    sub_config_paths = cur_entry.DepsInfo()['deps_configs']
-    to_scan.extend(
-        _ProjectEntry.FromBuildConfigPath(p) for p in sub_config_paths)
+  pending = list(main_entries)
+  # Scanning the dependency DAG is bound by reading and parsing one
+  # .build_config per node, so load each wave of unseen entries on a thread
+  # pool (the GIL is released during the file reads) before walking their
+  # deps_configs serially.
+  pool = multiprocessing.pool.ThreadPool(processes=16)
+  try:
+    while pending:
+      wave = []
+      for entry in pending:
+        if entry not in found:
+          found.add(entry)
+          wave.append(entry)
+      pool.map(lambda e: e.BuildConfig(), wave)
+      pending = []
+      for entry in wave:
+        sub_config_paths = entry.DepsInfo()['deps_configs']
+        pending.extend(
+            _ProjectEntry.FromBuildConfigPath(p) for p in sub_config_paths)
+  finally:
+    pool.close()
+    pool.join()
   return list(found)
 
 
@@ -580,14 +803,6 @@ def main():
   devil_chromium.Initialize(output_directory=output_dir)
   run_tests_helper.SetLogLevel(args.verbose_count)
 
-  _gradle_output_dir = os.path.abspath(
-      args.project_dir.replace('$CHROMIUM_OUTPUT_DIR', output_dir))
-  jinja_processor = jinja_template.JinjaProcessor(_FILE_DIR)
-  build_vars = _ReadBuildVars(output_dir)
-  generator = _ProjectContextGenerator(_gradle_output_dir, build_vars,
-      args.use_gradle_process_resources, jinja_processor)
-  logging.warning('Creating project at: %s', generator.project_dir)
-
   if args.all:
     # Run GN gen if necessary (faster than running "gn gen" in the no-op case).
     _RunNinja(constants.GetOutDirectory(), ['build.ninja'])
@@ -595,15 +810,32 @@ def main():
     targets = _QueryForAllGnTargets(output_dir)
   else:
     targets = args.targets or _DEFAULT_TARGETS
-    targets = [re.sub(r'_test_apk$', '_test_apk__apk', t) for t in targets]
+    targets = [t + '__apk' if t.endswith('_test_apk') else t for t in targets]
     # TODO(wnwen): Utilize Gradle's test constructs for our junit tests?
-    targets = [re.sub(r'_junit_tests$', '_junit_tests__java_binary', t)
+    targets = [t + '__java_binary' if t.endswith('_junit_tests') else t
                for t in targets]
 
-  main_entries = [_ProjectEntry(t) for t in targets]
+  main_entries = [_ProjectEntry.FromGnTarget(t) for t in targets]
 
   logging.warning('Building .build_config files...')
-  _RunNinja(output_dir, [e.NinjaBuildConfigTarget() for e in main_entries])
+  # Run the build in the background so it overlaps with the setup work below.
+  # The build_configs are not read until after the wait().
+  build_config_cmd = ['ninja', '-C', output_dir, '-j1000']
+  build_config_cmd.extend(e.NinjaBuildConfigTarget() for e in main_entries)
+  logging.info('Running: %r', build_config_cmd)
+  build_config_proc = subprocess.Popen(build_config_cmd)
+
+  _gradle_output_dir = os.path.abspath(
+      args.project_dir.replace('$CHROMIUM_OUTPUT_DIR', output_dir))
+  jinja_processor = jinja_template.JinjaProcessor(_FILE_DIR)
+  build_vars = _ReadBuildVars(output_dir)
+  generator = _ProjectContextGenerator(_gradle_output_dir, build_vars,
+      args.use_gradle_process_resources, jinja_processor)
+  logging.warning('Creating project at: %s', generator.project_dir)
+
+  if build_config_proc.wait() != 0:
+    raise subprocess.CalledProcessError(build_config_proc.returncode,
+                                        build_config_cmd)
 
   # There are many unused libraries, so restrict to those that are actually used
   # when using --all.
@@ -619,11 +851,21 @@ def main():
   project_entries = []
   zip_tuples = []
   generated_inputs = []
-  for entry in entries:
-    if entry.GetType() not in ('android_apk', 'java_library', 'java_binary'):
-      continue
-
-    data = _GenerateGradleFile(entry, generator, build_vars, jinja_processor)
+  entries = [e for e in entries
+             if e.GetType() in ('android_apk', 'java_library', 'java_binary')]
+  # Each entry renders independently and the build_config/source-list reads
+  # under _GenerateGradleFile release the GIL, so render on a thread pool and
+  # aggregate serially below to keep the outputs deterministic.
+  pool = multiprocessing.pool.ThreadPool()
+  try:
+    datas = pool.map(
+        lambda e: _GenerateGradleFile(e, generator, build_vars,
+                                      jinja_processor),
+        entries)
+  finally:
+    pool.close()
+    pool.join()
+  for entry, data in zip(entries, datas):
     if data:
       project_entries.append(entry)
       # Build all paths references by .gradle that exist within output_dir.
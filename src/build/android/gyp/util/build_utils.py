@@ -123,8 +123,10 @@ def WriteJson(obj, path, only_if_changed=False):
 
 
 def ReadJson(path):
-  with open(path, 'r') as jsonfile:
-    return json.load(jsonfile)
+  # Reading the whole file in one call and parsing from memory is faster than
+  # letting json.load() pull from the file object in chunks.
+  with open(path, 'rb') as jsonfile:
+    return json.loads(jsonfile.read())
 
 
 class CalledProcessError(Exception):